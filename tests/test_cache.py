@@ -1,10 +1,46 @@
+import io
+import sqlite3
+
 import pytest
 from collections import namedtuple
+from pathlib import Path
 
-from tradedangerous import cache
+from tradedangerous import cache, TradeEnv
 
 FakeFile = namedtuple('FakeFile', ['name'])
 
+
+def import_stations(monkeypatch, tmpdir, lines):
+    """
+    Run processImportFile with a tiny batch size, importing Station.csv
+    made from lines into a scratch DB, and return the DB.
+    """
+    db = sqlite3.connect(':memory:')
+    db.executescript("""
+        CREATE TABLE System (system_id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE Station (
+            station_id INTEGER PRIMARY KEY,
+            name TEXT,
+            system_id INTEGER NOT NULL
+        );
+        INSERT INTO System VALUES (1, 'SOL');
+    """)
+    importPath = Path(str(tmpdir), 'Station.csv')
+    with importPath.open('w') as fh:
+        fh.write("unq:station_id,name,unq:name@System.system_id\n")
+        fh.write("".join(line + "\n" for line in lines))
+    
+    # Python 3.11 no longer accepts the 'U' mode flag cache uses.
+    realOpen = Path.open
+    monkeypatch.setattr(
+        Path, 'open',
+        lambda self, mode = 'r', *args, **kwargs: realOpen(self, mode.replace('U', ''), *args, **kwargs)
+    )
+    monkeypatch.setattr(cache, 'IMPORT_BATCH', 2)
+    
+    cache.processImportFile(TradeEnv(), db, importPath, 'Station')
+    return db
+
 class TestCache(object):
     def test_parseSupply(self):
         fil = FakeFile('faked-file.prices')
@@ -37,3 +73,50 @@ class TestCache(object):
                 10,
                 'demand',
                 reading)
+    
+    def test_processPrices_quiet_ignore_unknown(self):
+        db = sqlite3.connect(':memory:')
+        db.executescript("""
+            CREATE TABLE System (system_id INTEGER PRIMARY KEY, name TEXT);
+            CREATE TABLE Station (
+                station_id INTEGER PRIMARY KEY, system_id INTEGER, name TEXT
+            );
+            CREATE TABLE Item (item_id INTEGER PRIMARY KEY, name TEXT);
+        """)
+        pricesFile = io.StringIO("@ NOWHERE/Somewhere\n")
+        pricesFile.name = 'faked-file.prices'
+        tdenv = TradeEnv(ignoreUnknown = True, quiet = 1, mergeImport = False)
+        
+        stations, items, *_ = cache.processPrices(tdenv, pricesFile, db, False)
+        
+        assert stations == ()
+        assert items == []
+    
+    def test_processImportFile_batches(self, monkeypatch, tmpdir):
+        # 5 rows with a batch size of 2 leaves a final partial batch.
+        db = import_stations(monkeypatch, tmpdir, [
+            "{},'Station {}','SOL'".format(ID, ID) for ID in range(1, 6)
+        ])
+        
+        assert db.execute("SELECT COUNT(*) FROM Station").fetchone()[0] == 5
+    
+    def test_processImportFile_duplicate_key(self, monkeypatch, tmpdir):
+        with pytest.raises(cache.DuplicateKeyError, match = 'Station.csv:5'):
+            import_stations(monkeypatch, tmpdir, [
+                "1,'Abe','SOL'",
+                "2,'Bob','SOL'",
+                "3,'Cid','SOL'",
+                "1,'Abe','SOL'",
+            ])
+    
+    def test_processImportFile_bad_row(self, monkeypatch, tmpdir):
+        # The unknown system fails the NOT NULL system_id on line 4, which
+        # is still unflushed when the duplicate key on line 5 is found;
+        # the bad row must be reported first.
+        with pytest.raises(SystemExit, match = 'Station.csv:4'):
+            import_stations(monkeypatch, tmpdir, [
+                "1,'Abe','SOL'",
+                "2,'Bob','SOL'",
+                "3,'Cid','NOWHERE'",
+                "1,'Abe','SOL'",
+            ])
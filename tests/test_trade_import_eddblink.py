@@ -1,7 +1,11 @@
+import builtins
 import os
+import sqlite3
+from pathlib import Path
 
 import pytest
 
+from tradedangerous import TradeEnv
 from tradedangerous.cli import trade
 from tradedangerous.plugins import eddblink_plug as module
 from .helpers import copy_fixtures, tdfactory
@@ -22,6 +26,69 @@ def teardown_module():
     tdb.close()
 
 
+OLD_DATE = '2019-01-01 00:00:00'
+# Epoch time of 2020-01-01 00:00:00, newer than OLD_DATE.
+NEW_STAMP = 1577836800
+
+
+class ListingsPlugin(module.ImportPlugin):
+    """ ImportPlugin over a scratch in-memory DB, for importListings. """
+    
+    def __init__(self, dataPath, db):
+        self.tdb = type('FakeTDB', (), {'getDB': lambda _self: db})()
+        self.tdenv = TradeEnv(quiet = 1)
+        self.dataPath = dataPath
+        self.listingsPath = Path(module.LISTINGS)
+        self.updated = {'Listings': False}
+
+
+def import_listings(monkeypatch, tmpdir, oldRows, listings):
+    """
+    Run importListings with a tiny batch size over a DB holding
+    oldRows (station_id, item_id) and a listings.csv of listings,
+    and return the resulting StationItem rows.
+    """
+    db = sqlite3.connect(':memory:')
+    db.executescript("""
+        CREATE TABLE Item (item_id INTEGER PRIMARY KEY, fdev_id INTEGER);
+        CREATE TABLE Station (station_id INTEGER PRIMARY KEY);
+        CREATE TABLE StationItem (
+            station_id, item_id, modified,
+            demand_price, demand_units, demand_level,
+            supply_price, supply_units, supply_level, from_live,
+            PRIMARY KEY (station_id, item_id)
+        );
+        INSERT INTO Item VALUES (1, 1), (2, 2), (3, 3);
+        INSERT INTO Station VALUES (10), (20), (30);
+    """)
+    db.executemany("""
+        INSERT INTO StationItem VALUES (?, ?, ?, 0, 0, 0, 0, 0, 0, 0)
+    """, [(stationID, itemID, OLD_DATE) for stationID, itemID in oldRows])
+    
+    dataPath = Path(str(tmpdir))
+    with (dataPath / module.LISTINGS).open('w') as fh:
+        fh.write(
+            "id,station_id,commodity_id,supply,supply_bracket,buy_price,"
+            "sell_price,demand,demand_bracket,collected_at\n"
+        )
+        for stationID, itemID in listings:
+            fh.write("0,{},{},1,1,1,1,1,1,{}\n".format(stationID, itemID, NEW_STAMP))
+    
+    # Python 3.11 no longer accepts the 'U' mode flag the plugin uses.
+    realOpen = builtins.open
+    monkeypatch.setattr(
+        module, 'open',
+        lambda f, mode = 'r', *args, **kwargs: realOpen(f, mode.replace('U', ''), *args, **kwargs),
+        raising = False
+    )
+    monkeypatch.setattr(module, 'LISTINGS_BATCH', 2)
+    
+    ListingsPlugin(dataPath, db).importListings(Path(module.LISTINGS))
+    return sorted(db.execute("""
+        SELECT station_id, item_id, demand_price FROM StationItem
+    """))
+
+
 class TestTradeImportEddblink(object):
     def test_create_instance(self, monkeypatch):
         plug = module.ImportPlugin(tdb, tdenv)
@@ -60,3 +127,26 @@ class TestTradeImportEddblink(object):
             print(captured.out)
             print("to Here")
         assert "NOTE: Import completed." in captured.out
+    
+    def test_listings_replace_old_station_data(self, monkeypatch, tmpdir):
+        rows = import_listings(
+            monkeypatch, tmpdir,
+            oldRows = [(20, 1), (20, 3)],
+            listings = [(20, 1), (20, 2)],
+        )
+        # (20, 3) was only in the old data, so it is gone.
+        assert rows == [(20, 1, 1), (20, 2, 1)]
+    
+    def test_listings_station_in_separate_groups(self, monkeypatch, tmpdir):
+        rows = import_listings(
+            monkeypatch, tmpdir,
+            oldRows = [(10, 1), (10, 3), (20, 1)],
+            listings = [(10, 1), (10, 2), (20, 1), (20, 2), (10, 3), (30, 1)],
+        )
+        # Station 10's first group was flushed before its second group
+        # was read; deleting station 10 again would have lost it.
+        assert rows == [
+            (10, 1, 1), (10, 2, 1), (10, 3, 1),
+            (20, 1, 1), (20, 2, 1),
+            (30, 1, 1),
+        ]
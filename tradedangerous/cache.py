@@ -95,6 +95,9 @@ $
 """.format(base_f = itemPriceFrag, qtylvl_f = qtyLevelFrag, time_f = timeFrag),
             re.IGNORECASE + re.VERBOSE)
 
+# Number of CSV rows processImportFile holds before writing them.
+IMPORT_BATCH = 5000
+
 ######################################################################
 # Exception classes
 
@@ -353,6 +356,11 @@ def processPrices(tdenv, priceFile, db, defaultZero):
     elif not quiet:
         ignoreOrWarn = tdenv.WARN
     
+    else:
+        
+        def ignoreOrWarn(error):
+            pass
+    
     def changeStation(matches):
         nonlocal facility, stationID
         nonlocal processedStations, processedItems, localAdd
@@ -482,10 +490,10 @@ def processPrices(tdenv, priceFile, db, defaultZero):
         lastModified = stationItemDates.get(itemID, None)
         if lastModified and merging:
             if modified and modified != 'now' and modified <= lastModified:
-                DEBUG1("Ignoring {} @ {}: {} <= {}".format(
+                DEBUG1("Ignoring {} @ {}: {} <= {}",
                     itemName, facility,
                     modified, lastModified,
-                ))
+                )
                 if modified < lastModified:
                     ignItems += 1
                 return
@@ -810,37 +818,76 @@ def processImportFile(tdenv, db, importPath, tableName):
         )
         
         # import the data
-        importCount = 0
         uniqueIndex = dict()
         
+        # Rows are written with executemany in batches of IMPORT_BATCH,
+        # rather than one execute per row, to bound memory use.
+        importCount = 0
+        importLines, importRows = [], []
+        addLine, addRow = importLines.append, importRows.append
+        
+        def flushRows():
+            nonlocal importCount
+            try:
+                db.executemany(sql_stmt, importRows)
+            except Exception:
+                # Replay the batch a row at a time to find the bad line;
+                # INSERT OR REPLACE makes re-applying earlier rows harmless.
+                for lineNo, linein in zip(importLines, importRows):
+                    try:
+                        db.execute(sql_stmt, linein)
+                    except Exception as e:
+                        raise SystemExit(
+                            "*** INTERNAL ERROR: {err}\n"
+                            "CSV File: {file}:{line}\n"
+                            "SQL Query: {query}\n"
+                            "Params: {params}\n"
+                            .format(
+                                err = str(e),
+                                file = str(importPath),
+                                line = lineNo,
+                                query = sql_stmt.strip(),
+                                params = linein
+                            )
+                        ) from None
+                raise
+            importCount += len(importRows)
+            importLines.clear()
+            importRows.clear()
+        
+        # Don't build the per-row debug text unless it will be shown.
+        debugValues = tdenv.debug >= 2
+        
         for linein in csvin:
             if not linein:
                 continue
             lineNo = csvin.line_num
             if len(linein) == columnCount:
-                tdenv.DEBUG1("       Values: {}", ', '.join(linein))
+                if debugValues:
+                    tdenv.DEBUG1("       Values: {}", ', '.join(linein))
                 if deprecationFn:
                     try:
                         deprecationFn(importPath, lineNo, linein)
                     except (DeprecatedKeyError, DeletedKeyError) as e:
                         if not tdenv.ignoreUnknown:
+                            flushRows()
                             raise e
                         e.category = "WARNING"
                         tdenv.NOTE("{}", e)
                         continue
                 if uniqueIndexes:
-                    # Need to construct the actual unique index key as
-                    # something less likely to collide with manmade
-                    # values when it's a compound.
-                    keyValues = [
+                    # Key on the tuple of values itself: compound keys
+                    # can't collide, and we don't pay for a join per row.
+                    key = tuple(
                         str(linein[col]).upper()
                         for col in uniqueIndexes
-                    ]
-                    key = ":!:".join(keyValues)
+                    )
                     prevLineNo = uniqueIndex.get(key, 0)
                     if prevLineNo:
+                        # Report any insert failure on an earlier line first.
+                        flushRows()
                         # Make a human-readable key
-                        key = "/".join(keyValues)
+                        key = "/".join(key)
                         raise DuplicateKeyError(
                             importPath, lineNo,
                             "entry", key,
@@ -848,23 +895,10 @@ def processImportFile(tdenv, db, importPath, tableName):
                         )
                     uniqueIndex[key] = lineNo
                 
-                try:
-                    db.execute(sql_stmt, linein)
-                except Exception as e:
-                    raise SystemExit(
-                        "*** INTERNAL ERROR: {err}\n"
-                        "CSV File: {file}:{line}\n"
-                        "SQL Query: {query}\n"
-                        "Params: {params}\n"
-                        .format(
-                            err = str(e),
-                            file = str(importPath),
-                            line = lineNo,
-                            query = sql_stmt.strip(),
-                            params = linein
-                        )
-                    ) from None
-                importCount += 1
+                addLine(lineNo)
+                addRow(linein)
+                if len(importRows) >= IMPORT_BATCH:
+                    flushRows()
             else:
                 tdenv.NOTE(
                         "Wrong number of columns ({}:{}): {}",
@@ -872,6 +906,9 @@ def processImportFile(tdenv, db, importPath, tableName):
                             lineNo,
                             ', '.join(linein)
                 )
+        
+        flushRows()
+        
         db.commit()
         tdenv.DEBUG0("{count} {table}s imported",
                             count = importCount,
@@ -963,12 +1000,16 @@ def buildCache(tdb, tdenv):
 def regeneratePricesFile(tdb, tdenv):
     tdenv.DEBUG0("Regenerating .prices file")
     
-    with tdb.pricesPath.open("w", encoding = 'utf-8') as pricesFile:
+    # Dump to a temporary file and then swap it in, so that an
+    # interrupted dump can't leave us with a truncated .prices file.
+    tempPath = tdb.pricesPath.with_suffix(".tmp")
+    with tempPath.open("w", encoding = 'utf-8') as pricesFile:
         prices.dumpPrices(
                 tdb.dbFilename,
                 prices.Element.full,
                 file = pricesFile,
                 debug = tdenv.debug)
+    os.replace(str(tempPath), str(tdb.pricesPath))
     
     # Update the DB file so we don't regenerate it.
     os.utime(tdb.dbFilename)
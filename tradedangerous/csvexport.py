@@ -207,10 +207,13 @@ def exportTableToFile(tdb, tdenv, tableName, dataPath=None):
         # finally generate the csv file
         # write header line without quotes
         exportFile.write("{}\n".format(",".join(csvHead)))
+        # Don't build the per-row debug text unless it will be shown.
+        debugRows = tdenv.debug > 2
         for line in cur.execute(sqlStmt):
             lineCount += 1
-            tdenv.DEBUG2("{count}: {values}".format(count=lineCount, values=list(line)))
-            exportOut.writerow(list(line))
+            if debugRows:
+                tdenv.DEBUG2("{count}: {values}", count=lineCount, values=list(line))
+            exportOut.writerow(line)
         tdenv.DEBUG1("{count} {table}s exported".format(count=lineCount, table=tableName))
     
     # Update the DB file so we don't regenerate it.
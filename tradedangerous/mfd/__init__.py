@@ -97,8 +97,8 @@ class X52ProMFD(DummyMFD):
     def attention(self, duration):
         page = self.page
         iterNo = 0
-        cutoff = time.time() + duration
-        while time.time() <= cutoff:
+        cutoff = time.monotonic() + duration
+        while time.monotonic() <= cutoff:
             for ledNo in range(0, 20):
                 page.set_led(ledNo, (iterNo + ledNo) % 4)
             iterNo += 1
@@ -66,8 +66,17 @@ import time
 import zlib
 import zmq
 
+try:
+    # orjson parses the decompressed bytes directly, without needing
+    # an intermediate str, and is several times quicker than json.
+    from orjson import loads as jsonLoads
+except ImportError:
+    def jsonLoads(jsdata):
+        return json.loads(jsdata.decode())
+
 from collections import defaultdict
 from collections import namedtuple
+from operator import itemgetter
 
 
 class MarketPrice(namedtuple('MarketPrice', [
@@ -83,7 +92,18 @@ class MarketPrice(namedtuple('MarketPrice', [
         'software',
         'version',
         ])):
-    pass
+    # Without this, every instance would also carry a __dict__.
+    __slots__ = ()
+
+
+# Pull all the fields we want out of a message in a single call.
+messageFields = itemgetter(
+    'systemName', 'stationName', 'itemName',
+    'buyPrice', 'sellPrice',
+    'demand', 'stationStock',
+    'timestamp',
+)
+headerFields = itemgetter('uploaderID', 'softwareName', 'softwareVersion')
 
 
 class Listener(object):
@@ -106,6 +126,7 @@ class Listener(object):
                             timer checks
         
         subscriber          ZMQ socket we're using
+        poller              ZMQ poller registered with the subscriber
         stats               Counters of nominal events
         errors              Counters of off-nominal events
         lastRecv            time of the last receive (or 0)
@@ -113,6 +134,8 @@ class Listener(object):
     
     uri = 'tcp://eddn-relay.elite-markets.net:9500'
     supportedSchema = 'http://schemas.elite-markets.net/eddn/commodity/1'
+    recvHighWaterMark = 100000
+    recvBufferSize = 4 * 1024 * 1024
     
     def __init__(
         self,
@@ -147,8 +170,15 @@ class Listener(object):
             del self.subscriber
         self.subscriber = newsub = self.zmqContext.socket(zmq.SUB)
         newsub.setsockopt(zmq.SUBSCRIBE, b"")
+        # Let zmq queue plenty of messages while we're busy processing
+        # a batch, rather than dropping them at the default limit.
+        newsub.setsockopt(zmq.RCVHWM, self.recvHighWaterMark)
+        newsub.setsockopt(zmq.RCVBUF, self.recvBufferSize)
         newsub.connect(self.uri)
-        self.lastRecv = time.time()
+        # socket.poll() builds a new Poller on every call, keep one.
+        self.poller = zmq.Poller()
+        self.poller.register(newsub, zmq.POLLIN)
+        self.lastRecv = time.monotonic()
         self.lastJsData = None
 
 
@@ -171,14 +201,14 @@ class Listener(object):
         or cutoff (absolute time) has been reached.
         """
         
-        now = time.time()
+        now = time.monotonic()
         
         cutoff = min(softCutoff, hardCutoff)
         if self.lastRecv < now - self.reconnectTimeout:
             if self.lastRecv:
                 self.errors['reconnects'] += 1
             self.connect()
-            now = time.time()
+            now = time.monotonic()
         
         nextCutoff = min(now + self.minBatchTime, cutoff)
         if now > nextCutoff:
@@ -187,8 +217,8 @@ class Listener(object):
         timeout = (nextCutoff - now) * 1000     # milliseconds
         
         # Wait for an event
-        events = self.subscriber.poll(timeout=timeout)
-        if events == 0:
+        events = self.poller.poll(timeout)
+        if not events:
             return False
         return True
 
@@ -217,13 +247,13 @@ class Listener(object):
             Errors are acculumated in the .errors dictionary. If you
             supply an 'onerror' function they are also passed to it.
         """
-        now = time.time()
+        now = time.monotonic()
         hardCutoff = now + self.maxBatchTime
         softCutoff = now + self.minBatchTime
         
         # hoists
         supportedSchema = self.supportedSchema
-        sub = self.subscriber
+        burstLimit = self.burstLimit
         stats, errors = self.stats, self.errors
         
         # Prices are stored as a dictionary of
@@ -236,15 +266,18 @@ class Listener(object):
             # When wait_for_data returns True, there is some data waiting,
             # possibly multiple messages. At this point we can afford to
             # suck down whatever is waiting in "nonblocking" mode until
-            # we reach the burst limit or we get EAGAIN.
+            # we reach the burst limit or the socket has nothing left.
+            # wait_for_data may have reconnected, so don't hoist this.
+            sub = self.subscriber
             bursts = 0
-            for _ in range(self.burstLimit):
+            for _ in range(burstLimit):
                 self.lastJsData = None
-                try:
-                    zdata = sub.recv(flags=zmq.NOBLOCK, copy=False)
-                    stats['recvs'] += 1
-                except zmq.error.Again:
+                # Stop when the queue is drained, rather than waiting
+                # for recv to raise EAGAIN.
+                if not sub.getsockopt(zmq.EVENTS) & zmq.POLLIN:
                     break
+                zdata = sub.recv(flags=zmq.NOBLOCK, copy=False)
+                stats['recvs'] += 1
                 
                 bursts += 1
                 
@@ -256,10 +289,8 @@ class Listener(object):
                         onerror("zlib.decompress: %s: %s"%(type(e), e))
                     continue
                 
-                bdata = jsdata.decode()
-                
                 try:
-                    data = json.loads(bdata)
+                    data = jsonLoads(jsdata)
                 except ValueError as e:
                     errors['loads'] += 1
                     if onerror:
@@ -281,19 +312,17 @@ class Listener(object):
                         onerror("unsupported schema: "+schema)
                     continue
                 try:
-                    header = data["header"]
-                    message = data["message"]
-                    system = message["systemName"].upper()
-                    station = message["stationName"].upper()
-                    item = message["itemName"].upper()
-                    buy = int(message["buyPrice"])
-                    sell = int(message["sellPrice"])
-                    demand = message["demand"]
-                    supply = message["stationStock"]
-                    timestamp = message["timestamp"]
-                    uploader = header["uploaderID"]
-                    software = header["softwareName"]
-                    swVersion = header["softwareVersion"]
+                    uploader, software, swVersion = headerFields(data["header"])
+                    (
+                        system, station, item,
+                        buy, sell,
+                        demand, supply,
+                        timestamp,
+                    ) = messageFields(data["message"])
+                    system = system.upper()
+                    station = station.upper()
+                    item = item.upper()
+                    buy, sell = int(buy), int(sell)
                 except (KeyError, ValueError) as e:
                     errors['json'] += 1
                     if onerror:
@@ -331,12 +360,18 @@ class Listener(object):
                     uploader, software, swVersion,
                 )
             
+            if not bursts:
+                continue
+            # Data is arriving, so the connection doesn't need resetting.
+            now = time.monotonic()
+            self.lastRecv = now
+            
             # For the edge-case where we wait 4.999 seconds and then
             # get a burst of data: stick around a little longer.
-            if bursts >= self.burstLimit:
+            if bursts >= burstLimit:
                 stats['numburst'] += 1
                 stats['maxburst'] = max(stats['maxburst'], bursts)
-                softCutoff = min(softCutoff, time.time() + 0.5)
+                softCutoff = min(softCutoff, now + 0.5)
         
         # to get average batch length, divide batchlen/batches.
         # you could do the same with prices/batches except that
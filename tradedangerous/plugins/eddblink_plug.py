@@ -33,6 +33,8 @@ STATIONS = "stations.jsonl"
 UPGRADES = "modules.json"
 LISTINGS = "listings.csv"
 LIVE_LISTINGS = "listings-live.csv"
+# Number of listings to hold in memory before writing them to the DB.
+LISTINGS_BATCH = 5000
 
 
 class DecodingError(PluginException):
@@ -142,6 +144,13 @@ class ImportPlugin(plugins.ImportPluginBase):
             for result in results:
                 yield result
     
+    @staticmethod
+    def percentDone(value, goal):
+        """
+        Progress bar postfix showing how far through the file we are.
+        """
+        return " " + str(round(value / goal * 100)) + "%"
+    
     @staticmethod
     def blocks(f, size = 65536):
         while True:
@@ -329,13 +338,17 @@ class ImportPlugin(plugins.ImportPluginBase):
         
         total = 1
         
-        with open(str(self.dataPath / self.systemsPath), "r", encoding = "utf-8", errors = 'ignore') as f:
-            total += (sum(bl.count("\n") for bl in self.blocks(f)))
+        with open(str(self.dataPath / self.systemsPath), "rb") as f:
+            total += (sum(bl.count(b"\n") for bl in self.blocks(f)))
+        
+        # Fetch every system's modified time up front, rather than
+        # querying the DB for each line of the dump.
+        systemDates = dict(self.execute("SELECT system_id, modified FROM System"))
         
         with open(str(self.dataPath / self.systemsPath), "rU") as fh:
             prog = pbar.Progress(total, 50)
             for line in fh:
-                prog.increment(1, postfix = lambda value, goal: " " + str(round(value / total * 100)) + "%")
+                prog.increment(1, postfix = self.percentDone)
                 system = json.loads(line)
                 system_id = system['id']
                 name = system['name']
@@ -344,11 +357,11 @@ class ImportPlugin(plugins.ImportPluginBase):
                 pos_z = system['z']
                 modified = datetime.datetime.utcfromtimestamp(system['updated_at']).strftime('%Y-%m-%d %H:%M:%S')
                 
-                result = self.execute("SELECT modified FROM System WHERE system_id = ?", (system_id,)).fetchone()
+                result = systemDates.get(system_id)
                 if result:
-                    updated = timegm(datetime.datetime.strptime(result[0], '%Y-%m-%d %H:%M:%S').timetuple())
+                    updated = timegm(datetime.datetime.strptime(result, '%Y-%m-%d %H:%M:%S').timetuple())
                     if system['updated_at'] > updated:
-                        tdenv.DEBUG0("System '{}' has been updated: '{}' vs '{}'", name, modified, result[0])
+                        tdenv.DEBUG0("System '{}' has been updated: '{}' vs '{}'", name, modified, result)
                         tdenv.DEBUG1("Updating: {}, {}, {}, {}, {}, {}", system_id, name, pos_x, pos_y, pos_z, modified)
                         self.execute("""UPDATE System
                                     SET name = ?,pos_x = ?,pos_y = ?,pos_z = ?,modified = ?
@@ -365,7 +378,7 @@ class ImportPlugin(plugins.ImportPluginBase):
                                 (system_id, name, pos_x, pos_y, pos_z, modified))
                     self.updated['System'] = True
             while prog.value < prog.maxValue:
-                prog.increment(1, postfix = lambda value, goal: " " + str(round(value / total * 100)) + "%")
+                prog.increment(1, postfix = self.percentDone)
             prog.clear()
         
         tdenv.NOTE("Finished processing Systems. End time = {}", datetime.datetime.now())
@@ -387,13 +400,20 @@ class ImportPlugin(plugins.ImportPluginBase):
         
         total = 1
         
-        with open(str(self.dataPath / self.stationsPath), "r", encoding = "utf-8", errors = 'ignore') as f:
-            total += (sum(bl.count("\n") for bl in self.blocks(f)))
+        with open(str(self.dataPath / self.stationsPath), "rb") as f:
+            total += (sum(bl.count(b"\n") for bl in self.blocks(f)))
+        
+        # Many stations share a system, so remember each system's name
+        # rather than querying for it once per station.
+        systemNames = dict()
+        
+        # Likewise, fetch every station's modified time up front.
+        stationDates = dict(self.execute("SELECT station_id, modified FROM Station"))
         
         with open(str(self.dataPath / self.stationsPath), "rU") as fh:
             prog = pbar.Progress(total, 50)
             for line in fh:
-                prog.increment(1, postfix = lambda value, goal: " " + str(round(value / total * 100)) + "%")
+                prog.increment(1, postfix = self.percentDone)
                 station = json.loads(line)
                 
                 # Import Stations
@@ -413,14 +433,17 @@ class ImportPlugin(plugins.ImportPluginBase):
                 planetary = 'Y' if station['is_planetary'] else 'N'
                 type_id = station['type_id'] if station['type_id'] else 0
                 
-                system = self.execute("SELECT System.name FROM System WHERE System.system_id = ?", (system_id,)).fetchone()[0].upper()
+                system = systemNames.get(system_id)
+                if system is None:
+                    system = self.execute("SELECT System.name FROM System WHERE System.system_id = ?", (system_id,)).fetchone()[0].upper()
+                    systemNames[system_id] = system
                 
-                result = self.execute("SELECT modified FROM Station WHERE station_id = ?", (station_id,)).fetchone()
+                result = stationDates.get(station_id)
                 if result:
-                    updated = timegm(datetime.datetime.strptime(result[0], '%Y-%m-%d %H:%M:%S').timetuple())
+                    updated = timegm(datetime.datetime.strptime(result, '%Y-%m-%d %H:%M:%S').timetuple())
                     if station['updated_at'] > updated:
                         tdenv.DEBUG0("{}/{} has been updated: {} vs {}",
-                                    system , name, modified, result[0])
+                                    system , name, modified, result)
                         tdenv.DEBUG1("Updating: {}, {}, {}, {}, {}, {}, {},"
                                               " {}, {}, {}, {}, {}, {}, {}, {}",
                                     station_id, name, system_id, ls_from_star, blackmarket,
@@ -527,7 +550,7 @@ class ImportPlugin(plugins.ImportPluginBase):
                                 continue
                         self.updated['UpgradeVendor'] = True
             while prog.value < prog.maxValue:
-                prog.increment(1, postfix = lambda value, goal: " " + str(round(value / total * 100)) + "%")
+                prog.increment(1, postfix = self.percentDone)
             prog.clear()
         
         tdenv.NOTE("Finished processing Stations. End time = {}", datetime.datetime.now())
@@ -572,18 +595,16 @@ class ImportPlugin(plugins.ImportPluginBase):
                     "buy_price_lower_average":0, "sell_price_upper_average":0, "is_non_marketable":0, "ed_id":ed_id,
                     "category":{"id":category_id, "name":category}}
         
+        edIDs = { c.get('ed_id', None) for c in commodities }
         for line in iter(edcd_dict):
-            if not any(c.get('ed_id', None) == int(line['id']) for c in commodities):
+            if int(line['id']) not in edIDs:
                 tdenv.DEBUG0("'{}' with fdev_id {} not found, adding.", line['name'], line['id'])
                 commodities.append(blankItem(line['name'], line['id'], line['category'], cat_ids[line['category']]))
         
         tdenv.NOTE("Missing item check complete.")
         
         # Prep-work for checking if an item's item_id has changed.
-        cur_ids = dict()
-        result = self.execute("SELECT fdev_id,item_id FROM Item ORDER BY fdev_id").fetchall()
-        for item in result:
-            cur_ids[item[0]] = item[1]
+        cur_ids = dict(self.execute("SELECT fdev_id,item_id FROM Item ORDER BY fdev_id"))
         
         tdenv.DEBUG0("Beginning loop.")
         for commodity in iter(commodities):
@@ -662,6 +683,7 @@ class ImportPlugin(plugins.ImportPluginBase):
                        """)
         cat_id = 0
         ui_order = 1
+        uiOrders = []
         tdenv.DEBUG0("Adding ui_order data to items.")
         for line in temp:
             if line[1] != cat_id:
@@ -669,10 +691,11 @@ class ImportPlugin(plugins.ImportPluginBase):
                 cat_id = line[1]
             else:
                 ui_order += 1
-            self.execute("""UPDATE Item
-                        set ui_order = ?
-                        WHERE fdev_id = ?""",
-                       (ui_order, line[2]))
+            uiOrders.append((ui_order, line[2]))
+        self.executemany("""UPDATE Item
+                    set ui_order = ?
+                    WHERE fdev_id = ?""",
+                   uiOrders)
         
         self.updated['Category'] = True
         self.updated['Item'] = True
@@ -725,13 +748,10 @@ class ImportPlugin(plugins.ImportPluginBase):
         
         # Used to check if the listings file is using the fdev_id as a temporary
         # item_id, but the item is in the DB with a permanent item_id.
-        fdev2item = dict()
-        result = self.execute("SELECT fdev_id,item_id FROM Item ORDER BY fdev_id").fetchall()
-        for item in result:
-            fdev2item[item[0]] = item[1]
+        fdev2item = dict(self.execute("SELECT fdev_id,item_id FROM Item ORDER BY fdev_id"))
         
-        with open(str(self.dataPath / listings_file), "r", encoding = "utf-8", errors = 'ignore') as f:
-            total += (sum(bl.count("\n") for bl in self.blocks(f)))
+        with open(str(self.dataPath / listings_file), "rb") as f:
+            total += (sum(bl.count(b"\n") for bl in self.blocks(f)))
         
         liveList = []
         liveStmt = """UPDATE StationItem
@@ -748,16 +768,53 @@ class ImportPlugin(plugins.ImportPluginBase):
                          supply_price, supply_units, supply_level, from_live)
                         VALUES ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )"""
         
-        items = []
-        it_result = self.execute("SELECT item_id FROM Item ORDER BY item_id").fetchall()
-        for item in it_result:
-            items.append(item[0])
+        items = {
+            itemID
+            for (itemID,) in self.execute("SELECT item_id FROM Item")
+        }
         
         stationList = {
             stationID
             for (stationID,) in self.execute("SELECT station_id FROM Station")
         }
         
+        # When each station's market data was last updated, fetched in a
+        # single query rather than once per station in the listings.
+        stationItemDates = dict(self.execute("""SELECT station_id, MAX(modified)
+                                    FROM StationItem
+                                    GROUP BY station_id"""))
+        
+        # Stations whose old data has already been queued for deletion.
+        # A station can appear more than once in the file, and deleting
+        # it again would wipe listings from an earlier, flushed, group.
+        deletedStations = set()
+        
+        def flushListings(notes = False):
+            """
+            Write out the pending changes, so listings.csv doesn't have
+            to be held in memory in its entirety.
+            Each station's delete is queued only once, ahead of its first
+            listing, so flushing the lists in order keeps them consistent.
+            """
+            if liveList:
+                if notes:
+                    tdenv.NOTE("Marking data now in the EDDB listings.csv as no longer 'live'. {}", datetime.datetime.now())
+                self.executemany(liveStmt, liveList)
+                liveList.clear()
+            if delList:
+                if notes:
+                    tdenv.NOTE("Deleting old listing data. {}", datetime.datetime.now())
+                self.executemany(delStmt, delList)
+                delList.clear()
+            if listingList:
+                if notes:
+                    tdenv.NOTE("Inserting new listing data. {}", datetime.datetime.now())
+                self.executemany(listingStmt, listingList)
+                listingList.clear()
+        
+        # flushListings() empties the lists in place, so these stay valid.
+        addLive, addDel, addListing = liveList.append, delList.append, listingList.append
+        
         with open(str(self.dataPath / listings_file), "rU") as fh:
             prog = pbar.Progress(total, 50)
             listings = csv.DictReader(fh)
@@ -765,7 +822,7 @@ class ImportPlugin(plugins.ImportPluginBase):
             cur_station = -1
             
             for listing in listings:
-                prog.increment(1, postfix = lambda value, goal: " " + str(round(value / total * 100)) + "%")
+                prog.increment(1, postfix = self.percentDone)
                 
                 station_id = int(listing['station_id'])
                 if station_id not in stationList:
@@ -777,12 +834,12 @@ class ImportPlugin(plugins.ImportPluginBase):
                     
                     # Check if listing already exists in DB and needs updated.
                     # Only need to check the date for the first item at a specific station.
-                    result = self.execute("SELECT modified FROM StationItem WHERE station_id = ?", (station_id,)).fetchone()
+                    result = stationItemDates.get(station_id)
                     if result:
-                        updated = timegm(datetime.datetime.strptime(result[0], '%Y-%m-%d %H:%M:%S').timetuple())
+                        updated = timegm(datetime.datetime.strptime(result, '%Y-%m-%d %H:%M:%S').timetuple())
                         # When the listings.csv data matches the database, update to make from_live == 0.
                         if int(listing['collected_at']) == updated and not from_live:
-                            liveList.append((cur_station,))
+                            addLive((cur_station,))
                         # Unless the import file data is newer, nothing else needs to be done for this station,
                         # so the rest of the listings for this station can be skipped.
                         if int(listing['collected_at']) <= updated:
@@ -790,7 +847,9 @@ class ImportPlugin(plugins.ImportPluginBase):
                             continue
                         
                         # The data from the import file is newer, so we need to delete the old data for this station.
-                        delList.append((cur_station,))
+                        if cur_station not in deletedStations:
+                            deletedStations.add(cur_station)
+                            addDel((cur_station,))
                 
                 if skipStation:
                     continue
@@ -808,24 +867,18 @@ class ImportPlugin(plugins.ImportPluginBase):
                 supply_units = int(listing['supply'])
                 supply_level = int(listing['supply_bracket']) if listing['supply_bracket'] != '' else -1
                 
-                listingList.append((station_id, item_id, modified,
-                                    demand_price, demand_units, demand_level,
-                                    supply_price, supply_units, supply_level, from_live))
+                addListing((station_id, item_id, modified,
+                            demand_price, demand_units, demand_level,
+                            supply_price, supply_units, supply_level, from_live))
+                if len(listingList) >= LISTINGS_BATCH:
+                    flushListings()
             
             while prog.value < prog.maxValue:
-                prog.increment(1, postfix = lambda value, goal: " " + str(round(value / total * 100)) + "%")
+                prog.increment(1, postfix = self.percentDone)
             prog.clear()
             
             tdenv.NOTE("Import file processing complete, updating database. {}", datetime.datetime.now())
-            if liveList:
-                tdenv.NOTE("Marking data now in the EDDB listings.csv as no longer 'live'. {}", datetime.datetime.now())
-                self.executemany(liveStmt, liveList)
-            if delList:
-                tdenv.NOTE("Deleting old listing data. {}", datetime.datetime.now())
-                self.executemany(delStmt, delList)
-            if listingList:
-                tdenv.NOTE("Inserting new listing data. {}", datetime.datetime.now())
-                self.executemany(listingStmt, listingList)
+            flushListings(notes = True)
         
         self.updated['Listings'] = True
         tdenv.NOTE("Finished processing market data. End time = {}", datetime.datetime.now())
@@ -574,6 +574,9 @@ class TradeDB(object):
         normalizedStr(text)
             Case and punctuation normalizes a string to make it easier
             to find approximate matches.
+        
+        normalizedDBStr(text)
+            Memoized normalizedStr, for names that come from the DB.
     """
     
     # Translation map for normalizing strings
@@ -583,6 +586,10 @@ class TradeDB(object):
         '[]()*+-.,{}:'
         )
     trimTrans = str.maketrans('', '', ' \'')
+    # normalizedDBStr results, keyed by the original text. Only names
+    # from the DB go in here, so it is bounded by the DB's contents;
+    # user-supplied text goes through the uncached normalizedStr.
+    normalizedCache = {}
     
     # The DB cache
     defaultDB = 'TradeDangerous.db'
@@ -2050,6 +2057,7 @@ class TradeDB(object):
         
         normTrans = TradeDB.normalizeTrans
         trimTrans = TradeDB.trimTrans
+        normalize = TradeDB.normalizedDBStr
         needle = lookup.translate(normTrans).translate(trimTrans)
         partialMatch, wordMatch = [], []
         # make a regex to match whole words
@@ -2057,7 +2065,7 @@ class TradeDB(object):
         # describe a match
         for entry in values:
             entryKey = key(entry)
-            normVal = entryKey.translate(normTrans).translate(trimTrans)
+            normVal = normalize(entryKey)
             if normVal.find(needle) > -1:
                 # If this is an exact match, ignore ambiguities.
                 if len(normVal) == len(needle):
@@ -2101,6 +2109,19 @@ class TradeDB(object):
         ).translate(
             TradeDB.trimTrans
         )
+    
+    @staticmethod
+    def normalizedDBStr(text):
+        """
+            As normalizedStr, but remembers the result. Only use this for
+            names from the DB, such as listSearch keys, since the cache
+            is never cleared.
+        """
+        normalized = TradeDB.normalizedCache.get(text)
+        if normalized is None:
+            normalized = TradeDB.normalizedStr(text)
+            TradeDB.normalizedCache[text] = normalized
+        return normalized
 
 ######################################################################
 # Assorted helpers
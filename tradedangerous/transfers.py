@@ -169,7 +169,7 @@ def download(
     histogram = deque()
     
     fetched = 0
-    lastTime = started = time.time()
+    lastTime = started = time.monotonic()
     spinner, spinners = 0, [
         '.    ', '..   ', '...  ', ' ... ', '  ...', '   ..', '    .'
     ]
@@ -183,7 +183,7 @@ def download(
                 shebang(bangLine)
                 shebang = None
             if progBar:
-                now = time.time()
+                now = time.monotonic()
                 deltaT = max(now - lastTime, 0.001)
                 lastTime = now
                 if len(histogram) >= 15:
@@ -205,7 +205,7 @@ def download(
     if not tdenv.quiet:
         if progBar:
             progBar.clear()
-        elapsed = (time.time() - started) or 1
+        elapsed = (time.monotonic() - started) or 1
         tdenv.NOTE(
             "Downloaded {} of {}ed data {}/s",
             makeUnit(fetched), encoding,